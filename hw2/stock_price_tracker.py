@@ -1,9 +1,12 @@
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
+import orjson
 import pandas as pd
 import plotly.graph_objects as go
-from datetime import datetime, timedelta
 import os
+import re
+from urllib.parse import urlencode
 
 # Page configuration
 st.set_page_config(
@@ -20,90 +23,121 @@ st.markdown("Enter a stock symbol to view the 7-day price chart and current info
 API_KEY = os.getenv("TWELVE_DATA_API_KEY", "demo")
 BASE_URL = "https://api.twelvedata.com"
 
-def fetch_stock_data(symbol):
+# Valid symbol: 1-10 letters, digits, dots, dashes or slashes (e.g. BRK.B, EUR/USD)
+SYMBOL_RE = re.compile(r"[A-Z0-9./\-]{1,10}")
+
+@st.cache_resource(show_spinner=False)
+def get_session():
     """
-    Fetch 7-day stock data from Twelve Data API
+    Shared HTTP session so reruns reuse keep-alive connections
+    """
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=4))
+    return session
+
+class StockDataError(Exception):
+    """
+    Error reported by the API or missing data for a symbol
     """
-    try:
-        # Calculate date range for 7 days
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=10)  # Get a few extra days to ensure we have 7 trading days
-        
-        # Format dates for API
-        start_date_str = start_date.strftime("%Y-%m-%d")
-        end_date_str = end_date.strftime("%Y-%m-%d")
-        
-        # API endpoint for time series data
-        url = f"{BASE_URL}/time_series"
-        params = {
-            "symbol": symbol.upper(),
-            "interval": "1day",
-            "start_date": start_date_str,
-            "end_date": end_date_str,
-            "apikey": API_KEY,
-            "format": "JSON"
-        }
-        
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        
-        data = response.json()
-        
-        # Check for API errors
-        if "status" in data and data["status"] == "error":
-            return None, data.get("message", "API returned an error")
-        
-        if "values" not in data or not data["values"]:
-            return None, f"No data found for symbol {symbol}. Please check if the symbol is valid."
-        
-        # Convert to DataFrame
-        df = pd.DataFrame(data["values"])
-        
-        # Convert datetime and numeric columns
-        df["datetime"] = pd.to_datetime(df["datetime"])
-        numeric_columns = ["open", "high", "low", "close", "volume"]
-        for col in numeric_columns:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors="coerce")
-        
-        # Sort by date (oldest first)
-        df = df.sort_values("datetime")
-        
-        # Keep only last 7 days of data
-        df = df.tail(7)
-        
-        return df, None
-        
-    except requests.exceptions.RequestException as e:
-        return None, f"Network error: {str(e)}"
-    except Exception as e:
-        return None, f"Error processing data: {str(e)}"
 
-def fetch_current_quote(symbol):
+@st.cache_data(ttl=30, show_spinner=False)
+def load_stock_data(symbol):
     """
-    Fetch current stock quote for additional information
+    Load 7-day stock data and current quote from Twelve Data API in one batch request
+    (raises on failure so only successful responses are cached)
+    """
+    # Batch endpoint bundles the time series and quote into a single round-trip
+    url = f"{BASE_URL}/batch"
+    time_series_params = {
+        "symbol": symbol.upper(),
+        "interval": "1day",
+        "outputsize": 7  # Last 7 trading days, newest first
+    }
+    quote_params = {
+        "symbol": symbol.upper()
+    }
+    payload = {
+        "time_series": {"url": f"/time_series?{urlencode(time_series_params)}"},
+        "quote": {"url": f"/quote?{urlencode(quote_params)}"}
+    }
+    
+    # The API key is sent once on the batch request and covers every sub-request
+    response = get_session().post(
+        url,
+        params={"apikey": API_KEY},
+        data=orjson.dumps(payload),
+        headers={"Content-Type": "application/json"},
+        timeout=10
+    )
+    response.raise_for_status()
+    
+    batch = orjson.loads(response.content)
+    
+    if not isinstance(batch, dict):
+        raise ValueError("Unexpected response format from API")
+    
+    # Check for batch-level API errors
+    if batch.get("status") == "error":
+        raise StockDataError(batch.get("message", "API returned an error"))
+    
+    results = batch.get("data")
+    if not isinstance(results, dict):
+        raise ValueError("Unexpected response format from API")
+    
+    time_series_result = results.get("time_series")
+    data = time_series_result.get("response") if isinstance(time_series_result, dict) else None
+    if not isinstance(data, dict):
+        raise ValueError("Unexpected response format from API")
+    
+    # Check for API errors
+    if data.get("status") == "error":
+        raise StockDataError(data.get("message", "API returned an error"))
+    
+    if not isinstance(data.get("values"), list) or not data["values"]:
+        raise StockDataError(f"No data found for symbol {symbol}. Please check if the symbol is valid.")
+    
+    # Quote is supplementary; a failed or malformed quote just hides the live metrics
+    quote_result = results.get("quote")
+    quote_data = quote_result.get("response") if isinstance(quote_result, dict) else None
+    if not isinstance(quote_data, dict) or not quote_data or quote_data.get("status") == "error":
+        quote_data = None
+    
+    # Convert to DataFrame
+    df = pd.DataFrame(data["values"])
+    
+    # Convert datetime and numeric columns
+    df["datetime"] = pd.to_datetime(df["datetime"])
+    numeric_columns = [col for col in ["open", "high", "low", "close", "volume"] if col in df.columns]
+    df[numeric_columns] = df[numeric_columns].apply(pd.to_numeric, errors="coerce")
+    
+    # Sort by date (oldest first)
+    df = df.sort_values("datetime")
+    
+    # Plain lists shared by the chart and the raw data table
+    series = {col: df[col].tolist() for col in numeric_columns}
+    series["dates"] = df["datetime"].values.astype("datetime64[D]").astype(str).tolist()
+    
+    # 7-day range, computed once so rendering is pure formatting
+    series["week_high"] = float(df["high"].max())
+    series["week_low"] = float(df["low"].min())
+    
+    return series, quote_data
+
+def fetch_stock_data(symbol):
+    """
+    Fetch stock data, turning failures into an error message (never cached)
     """
     try:
-        url = f"{BASE_URL}/quote"
-        params = {
-            "symbol": symbol.upper(),
-            "apikey": API_KEY
-        }
-        
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        
-        data = response.json()
-        
-        if "status" in data and data["status"] == "error":
-            return None
-            
-        return data
-        
-    except:
-        return None
+        series, quote_data = load_stock_data(symbol)
+        return series, quote_data, None
+    except StockDataError as e:
+        return None, None, str(e)
+    except requests.exceptions.RequestException as e:
+        return None, None, f"Network error: {str(e)}"
+    except (ValueError, KeyError) as e:
+        return None, None, f"Error processing data: {str(e)}"
 
-def create_price_chart(df, symbol):
+def create_price_chart(series, symbol):
     """
     Create an interactive price chart using Plotly
     """
@@ -111,11 +145,11 @@ def create_price_chart(df, symbol):
     
     # Add candlestick chart
     fig.add_trace(go.Candlestick(
-        x=df["datetime"],
-        open=df["open"],
-        high=df["high"],
-        low=df["low"],
-        close=df["close"],
+        x=series["dates"],
+        open=series["open"],
+        high=series["high"],
+        low=series["low"],
+        close=series["close"],
         name=f"{symbol.upper()} Price",
         increasing_line_color="green",
         decreasing_line_color="red"
@@ -133,11 +167,11 @@ def create_price_chart(df, symbol):
     
     return fig
 
-def display_stock_info(quote_data, df):
+def display_stock_info(quote_data, series):
     """
     Display current stock information in columns
     """
-    if quote_data and df is not None:
+    if quote_data and series is not None:
         col1, col2, col3, col4 = st.columns(4)
         
         # Current price
@@ -156,11 +190,8 @@ def display_stock_info(quote_data, df):
             )
         
         # 7-day range
-        if not df.empty:
-            week_high = df["high"].max()
-            week_low = df["low"].min()
-            col3.metric("7-Day High", f"${week_high:.2f}")
-            col4.metric("7-Day Low", f"${week_low:.2f}")
+        col3.metric("7-Day High", f"${series['week_high']:.2f}")
+        col4.metric("7-Day Low", f"${series['week_low']:.2f}")
 
 # Main application
 def main():
@@ -182,22 +213,35 @@ def main():
     if symbol and (search_button or symbol):
         symbol = symbol.strip().upper()
         
-        if len(symbol) < 1 or len(symbol) > 10:
-            st.error("Please enter a valid stock symbol (1-10 characters)")
+        if not SYMBOL_RE.fullmatch(symbol):
+            st.error("Please enter a valid stock symbol (1-10 letters, digits, '.', '-' or '/')")
             return
         
-        # Show loading spinner
-        with st.spinner(f"Fetching data for {symbol}..."):
-            # Fetch stock data
-            df, error = fetch_stock_data(symbol)
-            quote_data = fetch_current_quote(symbol)
+        # Only fetch when the symbol changed, the button was pressed or the last
+        # fetch failed; other widget interactions reuse results from session state
+        if (search_button
+                or symbol != st.session_state.get("last_symbol")
+                or st.session_state.get("last_series") is None):
+            # Show loading spinner
+            with st.spinner(f"Fetching data for {symbol}..."):
+                # Fetch time series and quote in a single batch request
+                series, quote_data, error = fetch_stock_data(symbol)
+            
+            # Failures are not kept, so the next rerun retries
+            st.session_state.last_symbol = symbol if error is None else None
+            st.session_state.last_series = series
+            st.session_state.last_quote = quote_data
+        else:
+            series = st.session_state.last_series
+            quote_data = st.session_state.last_quote
+            error = None
         
         if error:
             st.error(f"❌ {error}")
             st.info("💡 **Tip**: Make sure you're using a valid stock symbol (e.g., AAPL for Apple, GOOGL for Google)")
             return
         
-        if df is None or df.empty:
+        if series is None:
             st.error(f"No data available for {symbol}. Please check the symbol and try again.")
             return
         
@@ -205,27 +249,34 @@ def main():
         st.success(f"✅ Successfully loaded data for {symbol}")
         
         # Display current stock information
-        display_stock_info(quote_data, df)
+        display_stock_info(quote_data, series)
         
         # Display the chart
         st.subheader(f"📊 {symbol} - 7-Day Price Chart")
-        chart = create_price_chart(df, symbol)
+        chart = create_price_chart(series, symbol)
         st.plotly_chart(chart, use_container_width=True)
         
         # Display data table
         with st.expander("📋 View Raw Data"):
-            # Format the dataframe for display
-            display_df = df.copy()
-            display_df["Date"] = display_df["datetime"].dt.strftime("%Y-%m-%d")
-            display_df = display_df[["Date", "open", "high", "low", "close", "volume"]]
-            display_df.columns = ["Date", "Open", "High", "Low", "Close", "Volume"]
-            
-            # Format numeric columns
-            for col in ["Open", "High", "Low", "Close"]:
-                display_df[col] = display_df[col].apply(lambda x: f"${x:.2f}")
-            display_df["Volume"] = display_df["Volume"].apply(lambda x: f"{x:,.0f}")
+            # Format each row once from the shared series lists
+            # (currency and crypto pairs such as EUR/USD have no volume)
+            volumes = series.get("volume", [None] * len(series["dates"]))
+            rows = [
+                {
+                    "Date": date,
+                    "Open": f"${open_:.2f}",
+                    "High": f"${high:.2f}",
+                    "Low": f"${low:.2f}",
+                    "Close": f"${close:.2f}",
+                    "Volume": f"{volume:,.0f}" if volume is not None else ""
+                }
+                for date, open_, high, low, close, volume in zip(
+                    series["dates"], series["open"], series["high"],
+                    series["low"], series["close"], volumes
+                )
+            ]
             
-            st.dataframe(display_df, use_container_width=True, hide_index=True)
+            st.dataframe(rows, use_container_width=True, hide_index=True)
     
     # Instructions
     if not symbol: